@@ -148,7 +148,7 @@ class Assistant(Agent):
         Returns personalized greeting with company research if found.
         """
         try:
-            supabase_client = get_supabase_client()
+            supabase_client = await get_supabase_client()
             
             # Search by company first, then by name
             client_doc = await supabase_client.search_client_by_company(company)
@@ -307,7 +307,7 @@ class Assistant(Agent):
             Dict with success status and record info
         """
         try:
-            supabase_client = get_supabase_client()
+            supabase_client = await get_supabase_client()
             
             # Get client info from conversation context
             client_name = self.conversation_context.get("client_name", "Unknown")
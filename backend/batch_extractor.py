@@ -0,0 +1,191 @@
+"""
+Deferred name/company extraction for saved conversations via the OpenAI Batch API.
+
+/save-conversation stores transcripts with extraction_status='pending'. This
+worker periodically submits pending records as one batch job (50% of the
+synchronous price), then back-fills name/company when the job completes.
+
+Required columns on chat_history:
+    alter table chat_history add column extraction_status text;
+    alter table chat_history add column extraction_batch_id text;
+
+Run as a separate process: python -u backend/batch_extractor.py
+"""
+import os
+import json
+import asyncio
+import logging
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from llm_extractor import build_extraction_request, parse_extraction_response
+from supabase_client import SupabaseClient, get_supabase_client, close_supabase_client
+
+load_dotenv()
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger("BatchExtractor")
+
+# Seconds between submit/poll cycles
+POLL_INTERVAL = float(os.getenv("EXTRACTION_POLL_INTERVAL", 300))
+# Maximum records submitted in one batch job
+MAX_BATCH_ROWS = 1000
+BATCH_ENDPOINT = "/v1/chat/completions"
+FAILED_BATCH_STATUSES = ("failed", "expired", "cancelled")
+# Tries to record a created batch on its rows before cancelling the batch
+MARK_SUBMITTED_ATTEMPTS = 3
+
+
+def _load_chat_history(record: dict) -> list:
+    """Decode the chat_history column, which is stored as a JSON string."""
+    chat_history = record.get("chat_history") or []
+    if isinstance(chat_history, str):
+        chat_history = json.loads(chat_history)
+    return chat_history
+
+
+async def submit_pending(client: AsyncOpenAI, db: SupabaseClient) -> None:
+    """Submit all pending records as a single batch job."""
+    records = await db.get_chats_by_extraction_status("pending", MAX_BATCH_ROWS)
+    if not records:
+        return
+
+    lines = []
+    submitted_ids = []
+    empty_ids = []
+    bad_ids = []
+    for record in records:
+        # One undecodable row must not keep the rest from being submitted
+        try:
+            request = build_extraction_request(_load_chat_history(record))
+        except Exception as e:
+            logger.error("Cannot read chat_history of record %s: %s", record["id"], e)
+            bad_ids.append(record["id"])
+            continue
+        if not request:
+            empty_ids.append(record["id"])
+            continue
+        lines.append(json.dumps({
+            "custom_id": str(record["id"]),
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": request
+        }))
+        submitted_ids.append(record["id"])
+
+    # Nothing to ask the model about these, resolve them right away
+    await db.update_chat_records(empty_ids, {"name": "Unknown", "company": "Unknown", "extraction_status": "done"})
+    await db.update_chat_records(bad_ids, {"name": "Unknown", "company": "Unknown", "extraction_status": "failed"})
+    if not lines:
+        return
+
+    batch_file = await client.files.create(
+        file=("extraction.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+
+    # If the rows can't be marked submitted they would be sent (and billed) again
+    # next cycle, so retry and cancel the batch as a last resort
+    for attempt in range(MARK_SUBMITTED_ATTEMPTS):
+        if await db.update_chat_records(submitted_ids, {"extraction_status": "submitted", "extraction_batch_id": batch.id}):
+            logger.info("📤 Submitted extraction batch %s with %d conversations", batch.id, len(submitted_ids))
+            return
+        await asyncio.sleep(2 ** attempt)
+
+    logger.error("Could not mark %d records as submitted to batch %s, cancelling it", len(submitted_ids), batch.id)
+    await client.batches.cancel(batch.id)
+
+
+async def collect_results(client: AsyncOpenAI, db: SupabaseClient) -> None:
+    """Poll submitted batch jobs and back-fill name/company for finished ones."""
+    records = await db.get_chats_by_extraction_status("submitted", MAX_BATCH_ROWS * 10)
+    batches = {}
+    for record in records:
+        batches.setdefault(record.get("extraction_batch_id"), []).append(record["id"])
+
+    for batch_id, record_ids in batches.items():
+        # One broken batch must not hold up the others
+        try:
+            await _collect_batch(client, db, batch_id, record_ids)
+        except Exception as e:
+            logger.error("Failed to collect extraction batch %s: %s", batch_id, e)
+
+
+async def _collect_batch(client: AsyncOpenAI, db: SupabaseClient, batch_id: str, record_ids: list) -> None:
+    """Back-fill the records of one batch job if it has finished."""
+    if not batch_id:
+        await db.update_chat_records(record_ids, {"extraction_status": "pending"})
+        return
+
+    batch = await client.batches.retrieve(batch_id)
+
+    if batch.status in FAILED_BATCH_STATUSES:
+        logger.warning("Extraction batch %s ended with status %s, resubmitting", batch_id, batch.status)
+        await db.update_chat_records(record_ids, {"extraction_status": "pending", "extraction_batch_id": None})
+        return
+    if batch.status != "completed":
+        return
+
+    ids_by_custom_id = {str(rid): rid for rid in record_ids}
+    resolved = set()
+    if batch.output_file_id:
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            # A bad line only fails its own record, which is marked failed below
+            try:
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                content = response["body"]["choices"][0]["message"]["content"]
+                info = parse_extraction_response(content)
+
+                record_id = ids_by_custom_id.get(result.get("custom_id"))
+                if record_id is None:
+                    continue
+                updated = await db.update_chat_records([record_id], {
+                    "name": info["name"],
+                    "company": info["company"],
+                    "extraction_status": "done"
+                })
+                if updated:
+                    resolved.add(record_id)
+            except Exception as e:
+                logger.error("Bad extraction result in batch %s: %s", batch_id, e)
+
+    # Requests that errored inside the batch are not retried forever
+    failed_ids = [rid for rid in record_ids if rid not in resolved]
+    await db.update_chat_records(failed_ids, {"name": "Unknown", "company": "Unknown", "extraction_status": "failed"})
+    logger.info("📥 Batch %s done - %d extracted, %d failed", batch_id, len(resolved), len(failed_ids))
+
+
+async def run_forever() -> None:
+    """Alternate between collecting finished batches and submitting new ones."""
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    db = await get_supabase_client()
+    try:
+        while True:
+            # Collecting and submitting fail independently so neither can stall the other
+            try:
+                await collect_results(client, db)
+            except Exception as e:
+                logger.error("Collecting extraction batches failed: %s", e)
+            try:
+                await submit_pending(client, db)
+            except Exception as e:
+                logger.error("Submitting extraction batch failed: %s", e)
+            await asyncio.sleep(POLL_INTERVAL)
+    finally:
+        await client.close()
+        await close_supabase_client()
+
+
+if __name__ == "__main__":
+    logger.info("Starting batch extraction worker...")
+    asyncio.run(run_forever())
@@ -0,0 +1,24 @@
+# gunicorn.conf.py - Production process manager settings for server.py
+# Gunicorn supervises several uvicorn workers (uvloop + httptools when
+# installed via uvicorn[standard]); each worker runs its own event loop.
+import os
+
+# Render provides $PORT
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+
+# Make `server:app` importable no matter where gunicorn is launched from
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+worker_class = "uvicorn_worker.UvicornWorker"
+# Each worker loads the openai/livekit/supabase SDKs and opens its own
+# connection pools, so keep the default small; cpu_count() reports the
+# host's cores inside a container, not the instance's share.
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+
+# Extraction batches and Supabase writes can take a few seconds
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
@@ -11,37 +11,36 @@ load_dotenv()
 logger = logging.getLogger("LLMExtractor")
 
 
-def extract_user_info_from_chat(chat_history: list) -> dict:
+EXTRACTION_MODEL = "gpt-4o-mini"
+EXTRACTION_SYSTEM_PROMPT = "You are a data extraction assistant. Extract user information accurately. NEVER extract 'Aria' as the user's name. Return JSON only."
+INVALID_NAMES = ['aria', 'hi aria', 'hello aria', 'hey aria', 'hi', 'hello']
+
+
+def build_extraction_request(chat_history: list) -> dict:
     """
-    Use LLM to extract user's name and company from chat history.
-    Filters out greetings like 'Hi Aria' to avoid capturing 'Aria' as the user's name.
+    Build the chat completion request body used to extract name and company.
     
     Args:
         chat_history: List of transcript messages
         
     Returns:
-        Dict with 'name' and 'company' keys
+        Request body for /v1/chat/completions, or an empty dict if there is
+        no conversation text to analyze
     """
-    try:
-        from openai import OpenAI
-        
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        # Format chat history for LLM - only last 20 messages for speed
-        recent_messages = chat_history[-20:] if len(chat_history) > 20 else chat_history
-        
-        conversation_text = "\n".join([
-            f"{msg.get('speaker', 'Unknown')}: {msg.get('message', '')}" 
-            for msg in recent_messages
-            if msg.get('type') != 'system'  # Exclude system messages
-        ])
-        
-        if not conversation_text.strip():
-            logger.warning("No conversation text to analyze")
-            return {"name": "Unknown", "company": "Unknown"}
-        
-        # Create shorter, more focused prompt for faster extraction
-        extraction_prompt = f"""Extract the user's name and company from this conversation.
+    # Format chat history for LLM - only last 20 messages for speed
+    recent_messages = chat_history[-20:] if len(chat_history) > 20 else chat_history
+    
+    conversation_text = "\n".join([
+        f"{msg.get('speaker', 'Unknown')}: {msg.get('message', '')}" 
+        for msg in recent_messages
+        if msg.get('type') != 'system'  # Exclude system messages
+    ])
+    
+    if not conversation_text.strip():
+        return {}
+    
+    # Create shorter, more focused prompt for faster extraction
+    extraction_prompt = f"""Extract the user's name and company from this conversation.
 
 RULES:
 1. NEVER extract "Aria" as the user's name (Aria is the AI assistant)
@@ -55,39 +54,93 @@ Conversation:
 Respond ONLY with JSON in this exact format:
 {{"name": "extracted name or Unknown", "company": "extracted company or Unknown"}}
 """
+    
+    return {
+        "model": EXTRACTION_MODEL,
+        "messages": [
+            {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+            {"role": "user", "content": extraction_prompt}
+        ],
+        "temperature": 0,
+        "max_tokens": 100,  # Limit tokens for faster response
+        "response_format": {"type": "json_object"}
+    }
+
+
+def parse_extraction_response(content: str) -> dict:
+    """
+    Parse the model's JSON answer into name and company.
+    
+    Args:
+        content: Message content returned by the model
         
-        logger.info("🔍 Extracting user info from conversation...")
+    Returns:
+        Dict with 'name' and 'company' keys
+        
+    Raises:
+        json.JSONDecodeError: If the content is not valid JSON
+    """
+    result = json.loads(content)
+    return normalize_extracted_info(result if isinstance(result, dict) else {})
+
+
+def normalize_extracted_info(result: dict) -> dict:
+    """
+    Clean up one extracted {name, company} entry from the model.
+    
+    Args:
+        result: Dict as returned by the model, possibly with null or non-string values
+        
+    Returns:
+        Dict with string 'name' and 'company' keys, 'Unknown' where missing
+    """
+    # The model may answer null or a non-string; treat that as not found
+    name = result.get('name')
+    company = result.get('company')
+    name = name.strip() if isinstance(name, str) and name.strip() else 'Unknown'
+    company = company.strip() if isinstance(company, str) and company.strip() else 'Unknown'
+    
+    # Validate Aria is not captured
+    if name.lower() in INVALID_NAMES:
+        logger.warning("Filtered out invalid name: %s", name)
+        name = 'Unknown'
+    
+    return {"name": name, "company": company}
+
+
+def extract_user_info_from_chat(chat_history: list) -> dict:
+    """
+    Use LLM to extract user's name and company from chat history.
+    Filters out greetings like 'Hi Aria' to avoid capturing 'Aria' as the user's name.
+    
+    Args:
+        chat_history: List of transcript messages
         
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are a data extraction assistant. Extract user information accurately. NEVER extract 'Aria' as the user's name. Return JSON only."
-                },
-                {"role": "user", "content": extraction_prompt}
-            ],
-            temperature=0,
-            max_tokens=100,  # Limit tokens for faster response
-            response_format={"type": "json_object"}
-        )
+    Returns:
+        Dict with 'name' and 'company' keys
+    """
+    try:
+        from openai import OpenAI
+        
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         
-        result = json.loads(response.choices[0].message.content)
+        request = build_extraction_request(chat_history)
+        if not request:
+            logger.warning("No conversation text to analyze")
+            return {"name": "Unknown", "company": "Unknown"}
+        
+        logger.info("🔍 Extracting user info from conversation...")
         
-        # Validate Aria is not captured
-        name = result.get('name', 'Unknown')
-        company = result.get('company', 'Unknown')
+        response = client.chat.completions.create(**request)
         
-        if name.lower() in ['aria', 'hi aria', 'hello aria', 'hey aria', 'hi', 'hello']:
-            logger.warning(f"Filtered out invalid name: {name}")
-            name = 'Unknown'
+        info = parse_extraction_response(response.choices[0].message.content)
         
-        logger.info(f"✅ Extracted - Name: {name}, Company: {company}")
-        return {"name": name, "company": company}
+        logger.info("✅ Extracted - Name: %s, Company: %s", info['name'], info['company'])
+        return info
         
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse LLM response as JSON: {e}")
+        logger.error("Failed to parse LLM response as JSON: %s", e)
         return {"name": "Unknown", "company": "Unknown"}
     except Exception as e:
-        logger.error(f"Failed to extract user info: {e}")
+        logger.error("Failed to extract user info: %s", e)
         return {"name": "Unknown", "company": "Unknown"}
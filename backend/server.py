@@ -1,57 +1,198 @@
 import os
-import json
 import logging
 import asyncio
+import dataclasses
+import secrets
+import time
+import hashlib
+import orjson
+import httpx
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Set, Tuple, Callable, AsyncIterator
 from livekit import api
-from flask import Flask, request, jsonify
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from fastapi.middleware.cors import CORSMiddleware
+from brotli_asgi import BrotliMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse, Response
+from pydantic import BaseModel, ConfigDict
 from dotenv import load_dotenv
-from flask_cors import CORS
 from livekit.api import LiveKitAPI, ListRoomsRequest
-from supabase_client import get_supabase_client, format_chat_message
-import uuid
+from openai import AsyncOpenAI
+from supabase_client import get_supabase_client, close_supabase_client
+from llm_extractor import normalize_extracted_info
+from contextlib import asynccontextmanager
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+# Credentials are read once; a missing key fails at startup instead of on the first request
+LIVEKIT_API_KEY = os.environ["LIVEKIT_API_KEY"]
+LIVEKIT_API_SECRET = os.environ["LIVEKIT_API_SECRET"]
+OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
+
+# Grants shared by every token; only the room differs per request
+VIDEO_GRANTS = api.VideoGrants(room_join=True)
+
+# One OpenAI client per process so calls reuse keep-alive TLS connections
+openai_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=20), http2=True)
+)
+
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+class FastJSONResponse(Response):
+    """JSON response serialized straight to bytes by orjson."""
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class OrjsonRequest(Request):
+    """Request whose JSON body is parsed by orjson instead of the stdlib json module."""
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+class OrjsonRoute(APIRoute):
+    """Route that hands handlers (and body validation) an OrjsonRequest."""
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+        
+        async def route_handler(request: Request):
+            return await original_route_handler(OrjsonRequest(request.scope, request.receive))
+        
+        return route_handler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers and release pooled connections when the worker shuts down."""
+    client_info_batcher.start()
+    yield
+    await client_info_batcher.stop()
+    await close_supabase_client()
+    await close_livekit_api()
+    await openai_client.close()
+
+# Debug tracebacks in error responses only when explicitly running in dev mode
+DEV_MODE = os.getenv("TEKISHO_DEV") == "1"
+
+app = FastAPI(title="Tekisho Chat API", debug=DEV_MODE, default_response_class=FastJSONResponse, lifespan=lifespan)
+app.router.route_class = OrjsonRoute
+# Compress larger bodies (chat lists); /health and small responses stay below the threshold
+app.add_middleware(BrotliMiddleware, quality=4, minimum_size=1024, gzip_fallback=True)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger("TekishoServer")
 
+class ChatMsg(BaseModel):
+    """A single chat message; unknown keys are kept as sent by the client."""
+    model_config = ConfigDict(extra="allow")
+
+    timestamp: Any = None
+    speaker: Optional[str] = None
+    message: Optional[str] = None
+    type: Optional[str] = None
+
+class SaveChatBody(BaseModel):
+    # null is accepted and treated like a missing field, as before the FastAPI port
+    name: Optional[str] = None
+    company_name: Optional[str] = None
+    chat_history: Optional[List[ChatMsg]] = None
+
+class ChatHistoryBody(BaseModel):
+    chat_history: Optional[List[ChatMsg]] = None
+
+def json_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """Build a JSON response directly, skipping FastAPI's jsonable_encoder pass over the payload."""
+    return FastJSONResponse(content, status_code=status_code)
+
+def raw_json_response(body: bytes, status_code: int = 200) -> Response:
+    """Send an already-serialized JSON body."""
+    return Response(body, status_code=status_code, media_type="application/json")
+
+# Static response bodies, serialized once at import
+HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "Tekisho Chat API"})
+NO_CHAT_HISTORY_BODY = orjson.dumps({"error": "No chat history provided"})
+EMPTY_CHAT_HISTORY_BODY = orjson.dumps({"error": "Chat history is empty"})
+BAD_LIMIT_BODY = orjson.dumps({"error": "limit must be a positive integer"})
+NO_JSON_BODY = orjson.dumps({"error": "No JSON data provided"})
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError) -> Response:
+    """Report validation failures as 400 {"error": ...} like the rest of the API, not 422 {"detail": ...}."""
+    errors = exc.errors()
+    for error in errors:
+        loc = tuple(error.get("loc", ()))
+        # Missing or unparseable request body
+        if loc == ("body",) or error.get("type") == "json_invalid":
+            return raw_json_response(NO_JSON_BODY, 400)
+        if loc == ("query", "limit"):
+            return raw_json_response(BAD_LIMIT_BODY, 400)
+    fields = ", ".join(".".join(str(part) for part in error.get("loc", ())[1:]) for error in errors)
+    return json_response({"error": f"Invalid value for {fields}"}, 400)
+
+def _dump_history(chat_history: Optional[List[ChatMsg]]) -> List[Dict[str, Any]]:
+    """Convert validated messages back to plain dicts, preserving only the keys the client sent."""
+    return [msg.model_dump(exclude_unset=True) for msg in chat_history or []]
+
+# LiveKit room names are cached briefly so minting a token doesn't cost a
+# ListRooms round trip every time; the collision check only needs to be
+# approximately current.
+ROOMS_CACHE_TTL = 30.0
+_rooms_cache: Set[str] = set()
+_rooms_cache_ts = 0.0
+_lk_api: Optional[LiveKitAPI] = None
+
+def get_livekit_api() -> LiveKitAPI:
+    """Get or create the LiveKit API client shared by all requests."""
+    global _lk_api
+    if _lk_api is None:
+        _lk_api = LiveKitAPI(api_key=LIVEKIT_API_KEY, api_secret=LIVEKIT_API_SECRET)
+    return _lk_api
+
+async def close_livekit_api() -> None:
+    """Close the shared LiveKit API client, if one was created."""
+    global _lk_api
+    if _lk_api is not None:
+        await _lk_api.aclose()
+        _lk_api = None
+
 async def generate_room_name():
-    name = "room-" + str(uuid.uuid4())[:8]
     rooms = await get_rooms()
+    name = f"room-{secrets.token_hex(4)}"
     while name in rooms:
-        name = "room-" + str(uuid.uuid4())[:8]
+        name = f"room-{secrets.token_hex(4)}"
+    # Remember our own rooms until the next refresh picks them up
+    rooms.add(name)
     return name
 
-async def get_rooms():
-    api = LiveKitAPI()
-    rooms = await api.room.list_rooms(ListRoomsRequest())
-    await api.aclose()
-    return [room.name for room in rooms.rooms]
+async def get_rooms() -> Set[str]:
+    global _rooms_cache, _rooms_cache_ts
+    if time.monotonic() - _rooms_cache_ts > ROOMS_CACHE_TTL:
+        rooms = await get_livekit_api().room.list_rooms(ListRoomsRequest())
+        _rooms_cache = {room.name for room in rooms.rooms}
+        _rooms_cache_ts = time.monotonic()
+    return _rooms_cache
 
-@app.route("/getToken")
-async def get_token():
-    name = request.args.get("name", "my name")
-    room = request.args.get("room", None)
-    
+@app.get("/getToken", response_class=PlainTextResponse)
+async def get_token(name: str = "my name", room: Optional[str] = None):
     if not room:
         room = await generate_room_name()
         
-    token = api.AccessToken(os.getenv("LIVEKIT_API_KEY"), os.getenv("LIVEKIT_API_SECRET")) \
+    token = api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET) \
         .with_identity(name)\
         .with_name(name)\
-        .with_grants(api.VideoGrants(
-            room_join=True,
-            room=room
-        ))
+        .with_grants(dataclasses.replace(VIDEO_GRANTS, room=room))
     
-    return token.to_jwt()
+    return PlainTextResponse(token.to_jwt())
 
-@app.route("/save_chat", methods=["POST"])
-async def save_chat():
+@app.post("/save_chat")
+async def save_chat(body: SaveChatBody):
     """
     Save chat history to Supabase when conversation ends.
     
@@ -70,76 +211,293 @@ async def save_chat():
     }
     """
     try:
-        # Get JSON data from request
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
-        
-        # Validate required fields
-        name = data.get("name", "Unknown")
-        company_name = data.get("company_name", "Unknown Company")
-        chat_history = data.get("chat_history", [])
+        name = body.name if body.name is not None else "Unknown"
+        company_name = body.company_name if body.company_name is not None else "Unknown Company"
+        chat_history = _dump_history(body.chat_history)
         
         if not chat_history:
-            return jsonify({"error": "No chat history provided"}), 400
+            return raw_json_response(NO_CHAT_HISTORY_BODY, 400)
         
-        logger.info(f"Received request to save chat for {name} from {company_name} with {len(chat_history)} messages")
+        logger.info("Received request to save chat for %s from %s with %d messages", name, company_name, len(chat_history))
         
         # Get Supabase client and save chat
-        supabase_client = get_supabase_client()
+        supabase_client = await get_supabase_client()
         result = await supabase_client.save_chat_history(name, company_name, chat_history)
         
         if "error" in result:
-            logger.error(f"Failed to save chat: {result['error']}")
-            return jsonify({"error": result["error"]}), 500
-        
-        logger.info(f"Successfully saved chat history for {name}")
-        return jsonify({
+            logger.error("Failed to save chat: %s", result['error'])
+            return json_response({"error": result["error"]}, 500)
+        
+        duplicate = result.get("duplicate", False)
+        if duplicate:
+            logger.info("Chat history for %s was already saved", name)
+            message = f"Chat history for {name} was already saved"
+        else:
+            logger.info("Successfully saved chat history for %s", name)
+            message = f"Chat history saved successfully for {name}"
+        return json_response({
             "success": True,
-            "message": f"Chat history saved successfully for {name}",
+            "message": message,
+            "duplicate": duplicate,
             "record_id": result.get("id"),
             "message_count": len(chat_history)
         })
         
     except Exception as e:
-        logger.error(f"Error in save_chat endpoint: {str(e)}")
-        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+        logger.error("Error in save_chat endpoint: %s", e)
+        return json_response({"error": f"Internal server error: {str(e)}"}, 500)
+
+# Upper bound on /get_chats?limit= so one request can't pull the whole table
+MAX_CHATS_LIMIT = 500
+
+async def _stream_chats(first_page: List[Dict[str, Any]], pages: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """
+    Emit {"success": true, "chats": [...], "count": N} one record at a time.
+    
+    An error fetching a later page propagates and aborts the response, so
+    the client sees an incomplete body rather than a truncated success.
+    """
+    count = 0
+    yield b'{"success":true,"chats":['
+    page = first_page
+    while page:
+        for chat in page:
+            yield (b"," if count else b"") + orjson.dumps(chat, option=ORJSON_OPTIONS)
+            count += 1
+        page = await anext(pages, None)
+    logger.info("Retrieved %d chat records", count)
+    yield b'],"count":' + str(count).encode() + b"}"
 
-@app.route("/get_chats", methods=["GET"])
-async def get_chats():
+@app.get("/get_chats")
+async def get_chats(name: Optional[str] = None, company_name: Optional[str] = None, limit: int = 50):
     """
     Retrieve chat history from Supabase.
     
     Query parameters:
     - name: Optional filter by client name
     - company_name: Optional filter by company name
-    - limit: Maximum number of records (default 50)
+    - limit: Maximum number of records (default 50, capped at MAX_CHATS_LIMIT)
+    
+    Records are fetched in pages of CHAT_PAGE_SIZE, one sequential query per
+    page, so limit=500 takes 5 round trips to Supabase.
     """
+    if limit <= 0:
+        return raw_json_response(BAD_LIMIT_BODY, 400)
+    limit = min(limit, MAX_CHATS_LIMIT)
+    
     try:
-        # Get query parameters
-        name = request.args.get("name")
-        company_name = request.args.get("company_name")
-        limit = int(request.args.get("limit", 50))
-        
-        logger.info(f"Retrieving chats with filters: name={name}, company={company_name}, limit={limit}")
+        logger.info("Retrieving chats with filters: name=%s, company=%s, limit=%s", name, company_name, limit)
         
-        # Get Supabase client and retrieve chats
-        supabase_client = get_supabase_client()
-        chats = await supabase_client.get_chat_history(name, company_name, limit)
-        
-        logger.info(f"Retrieved {len(chats)} chat records")
-        return jsonify({
-            "success": True,
-            "chats": chats,
-            "count": len(chats)
-        })
+        supabase_client = await get_supabase_client()
+        pages = supabase_client.iter_chat_history_pages(name, company_name, limit)
+        # Fetch the first page up front so an early failure is still a proper 500
+        first_page = await anext(pages, [])
         
     except Exception as e:
-        logger.error(f"Error in get_chats endpoint: {str(e)}")
-        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+        logger.error("Error in get_chats endpoint: %s", e)
+        return json_response({"error": f"Internal server error: {str(e)}"}, 500)
+    
+    # Remaining pages are serialized and sent as they arrive
+    return StreamingResponse(_stream_chats(first_page, pages), media_type="application/json")
+
+# Exact-match cache for /extract_client_info. Extraction is deterministic
+# (temperature=0), so a conversation we've already analysed is answered
+# without another LLM round trip.
+EXTRACT_CACHE_MAX = 10_000
+EXTRACT_CACHE_TTL = 24 * 3600.0
+_extract_cache: "OrderedDict[str, Tuple[float, Dict[str, str]]]" = OrderedDict()
+
+def _extract_cache_get(key: str) -> Optional[Dict[str, str]]:
+    """Return a cached extraction result, or None if missing or expired."""
+    entry = _extract_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        del _extract_cache[key]
+        return None
+    _extract_cache.move_to_end(key)
+    return value
+
+def _extract_cache_put(key: str, value: Dict[str, str]) -> None:
+    """Store an extraction result, evicting the least recently used entry when full."""
+    _extract_cache[key] = (time.monotonic() + EXTRACT_CACHE_TTL, value)
+    _extract_cache.move_to_end(key)
+    if len(_extract_cache) > EXTRACT_CACHE_MAX:
+        _extract_cache.popitem(last=False)
 
-@app.route("/extract_client_info", methods=["POST"])
-async def extract_client_info():
+# Concurrent /extract_client_info requests are coalesced into one LLM call
+# so the instructions are paid for once per batch rather than per request.
+EXTRACT_MAX_BATCH = 16
+EXTRACT_MAX_WAIT = 0.05
+# Messages from the start and end of a conversation sent for extraction
+EXTRACT_HEAD_MESSAGES = 20
+EXTRACT_TAIL_MESSAGES = 5
+
+EXTRACT_SYSTEM_PROMPT = (
+    "Extract the client's name and company from each conversation. "
+    "Return ONLY JSON of the form {\"results\": [{\"index\": 0, \"name\": \"...\", \"company\": \"...\"}]}, "
+    "one entry per conversation, where index is the conversation number. "
+    "Use \"Unknown\" for anything not stated."
+)
+
+async def _request_client_info(conversations: List[str]) -> Tuple[List[Optional[Dict[str, str]]], bool]:
+    """
+    Ask the LLM for client name and company of several conversations in one call.
+    
+    Args:
+        conversations: Conversation transcripts, one per request
+        
+    Returns:
+        Tuple of (one {"name", "company"} dict per conversation, in order,
+        None where the answer has no entry or several entries for that
+        conversation; True if the answer also had entries that match no
+        conversation)
+    """
+    numbered = "\n\n".join(
+        f"Conversation {index}:\n{text}" for index, text in enumerate(conversations)
+    )
+    
+    response = await openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": EXTRACT_SYSTEM_PROMPT},
+            {"role": "user", "content": numbered}
+        ],
+        max_tokens=60 * len(conversations),
+        temperature=0
+    )
+    results: List[Optional[Dict[str, str]]] = [None] * len(conversations)
+    
+    # JSON mode still returns cut-off JSON when the answer hits max_tokens
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        logger.warning("Client info answer truncated for %d conversations", len(conversations))
+        return results, False
+    try:
+        extracted = orjson.loads(choice.message.content)
+    except orjson.JSONDecodeError as e:
+        logger.warning("Could not parse client info answer: %s", e)
+        return results, False
+    items = extracted.get("results") if isinstance(extracted, dict) else None
+    if not isinstance(items, list):
+        logger.warning("Client info answer has no results list")
+        return results, False
+    
+    entries: Dict[int, List[Dict[str, Any]]] = {}
+    malformed = False
+    for item in items:
+        index = item.get("index") if isinstance(item, dict) else None
+        if isinstance(index, int) and 0 <= index < len(conversations):
+            entries.setdefault(index, []).append(item)
+        else:
+            malformed = True
+    
+    for index, matches in entries.items():
+        if len(matches) == 1:
+            results[index] = normalize_extracted_info(matches[0])
+    return results, malformed
+
+async def _extract_client_info_batch(conversations: List[str]) -> List[Optional[Dict[str, str]]]:
+    """
+    Extract client name and company for several conversations, batching them into one LLM call.
+    
+    Args:
+        conversations: Conversation transcripts, one per request
+        
+    Returns:
+        One {"name", "company"} dict per conversation, in order; None where
+        no answer could be attributed to that conversation
+    """
+    results, malformed = await _request_client_info(conversations)
+    
+    # Batching puts unrelated users' transcripts in one prompt, and each answer
+    # is returned to its user and cached for 24h by conversation. A mixed-up
+    # answer would leak one client's details to another, so the batch is only
+    # trusted where it has exactly one entry per conversation. Anything else
+    # is asked again on its own, which costs a separate call (prompt overhead
+    # included) for those conversations.
+    if len(conversations) > 1:
+        retry = range(len(conversations)) if malformed else [i for i, result in enumerate(results) if result is None]
+        singles = await asyncio.gather(*(_request_client_info([conversations[i]]) for i in retry))
+        for i, (single, _) in zip(retry, singles):
+            results[i] = single[0]
+    return results
+
+class ClientInfoBatcher:
+    """Collects extraction requests for a short window and sends them to the LLM together."""
+    
+    def __init__(self, max_batch: int = EXTRACT_MAX_BATCH, max_wait: float = EXTRACT_MAX_WAIT):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "asyncio.Queue[Tuple[asyncio.Future, str]]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+    
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the worker and wait for batches already sent to the LLM."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while not self._queue.empty():
+            future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Client info extraction is shutting down"))
+    
+    async def extract(self, conversation_text: str) -> Optional[Dict[str, str]]:
+        """Queue a conversation and wait for its slot in the next batch."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((future, conversation_text))
+        return await future
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without waiting so the next window starts collecting immediately
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[asyncio.Future, str]]) -> None:
+        try:
+            results = await _extract_client_info_batch([text for _, text in batch])
+        except Exception as e:
+            logger.error("Batched client info extraction failed: %s", e)
+            for future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        logger.info("Extracted client info for a batch of %d conversations", len(batch))
+        for (future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+client_info_batcher = ClientInfoBatcher()
+
+@app.post("/extract_client_info")
+async def extract_client_info(body: ChatHistoryBody):
     """
     Use LLM to extract client name and company from chat history.
     
@@ -154,170 +512,112 @@ async def extract_client_info():
     }
     """
     try:
-        # Get JSON data from request
-        data = request.get_json()
-        if not data or not data.get("chat_history"):
-            return jsonify({"error": "No chat history provided"}), 400
-        
-        chat_history = data.get("chat_history", [])
-        
-        # Prepare conversation text for LLM
-        conversation_text = ""
-        for msg in chat_history:
-            speaker = msg.get("speaker", "Unknown")
-            message = msg.get("message", "")
-            conversation_text += f"{speaker}: {message}\n"
-        
-        # Use OpenAI to extract client information
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        prompt = f"""
-        Analyze the following conversation and extract the client's name and company name.
-        Return ONLY a JSON object with 'name' and 'company' fields.
-        If information is not found, use 'Unknown' for that field.
-        
-        Conversation:
-        {conversation_text}
-        
-        Example response format:
-        {{"name": "John Doe", "company": "Acme Corp"}}
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=100,
-            temperature=0.1
+        chat_history = _dump_history(body.chat_history)
+        if not chat_history:
+            return raw_json_response(NO_CHAT_HISTORY_BODY, 400)
+        
+        # Prepare conversation text for LLM. Name and company come up early,
+        # so long sessions only send the opening turns plus the last few.
+        if len(chat_history) > EXTRACT_HEAD_MESSAGES + EXTRACT_TAIL_MESSAGES:
+            chat_history = chat_history[:EXTRACT_HEAD_MESSAGES] + chat_history[-EXTRACT_TAIL_MESSAGES:]
+        conversation_text = "\n".join(
+            f"{msg.get('speaker', 'Unknown')}: {msg.get('message', '')}" for msg in chat_history
         )
         
-        # Parse the LLM response
-        result_text = response.choices[0].message.content.strip()
-        
-        try:
-            # Try to parse as JSON
-            import json
-            extracted_info = json.loads(result_text)
-            name = extracted_info.get("name", "Unknown")
-            company = extracted_info.get("company", "Unknown")
-        except:
-            # Fallback if JSON parsing fails
+        cache_key = hashlib.sha256(conversation_text.encode()).hexdigest()
+        cached = _extract_cache_get(cache_key)
+        if cached is not None:
+            logger.info("Extracted client info (cached): %s from %s", cached['name'], cached['company'])
+            return json_response({"success": True, **cached})
+        
+        extracted = await client_info_batcher.extract(conversation_text)
+        if extracted is not None:
+            name = extracted["name"]
+            company = extracted["company"]
+            _extract_cache_put(cache_key, extracted)
+        else:
+            # Fallback if the model's answer skipped this conversation
             name = "Unknown"
             company = "Unknown"
         
-        logger.info(f"Extracted client info: {name} from {company}")
+        logger.info("Extracted client info: %s from %s", name, company)
         
-        return jsonify({
+        return json_response({
             "success": True,
             "name": name,
             "company": company
         })
         
     except Exception as e:
-        logger.error(f"Error in extract_client_info endpoint: {str(e)}")
-        return jsonify({"error": f"Failed to extract client info: {str(e)}"}), 500
+        logger.error("Error in extract_client_info endpoint: %s", e)
+        return json_response({"error": f"Failed to extract client info: {str(e)}"}, 500)
 
-@app.route("/health", methods=["GET"])
-def health_check():
+@app.get("/health")
+async def health_check():
     """Health check endpoint."""
-    return jsonify({"status": "healthy", "service": "Tekisho Chat API"})
+    return raw_json_response(HEALTH_BODY)
 
-@app.route("/save-conversation", methods=["POST"])
-def save_conversation():
+@app.post("/save-conversation")
+async def save_conversation(body: ChatHistoryBody):
     """
     Endpoint to save conversation transcript to database.
-    Extracts user name and company using LLM.
+    User name and company are extracted later by the batch extraction
+    worker (batch_extractor.py), so the record is saved as 'pending'.
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'chat_history' not in data:
-            return jsonify({"error": "No chat history provided"}), 400
-        
-        chat_history = data['chat_history']
+        chat_history = _dump_history(body.chat_history)
         
         if not chat_history:
-            return jsonify({"error": "Chat history is empty"}), 400
-        
-        logger.info(f"📝 Processing conversation save - {len(chat_history)} messages")
+            return raw_json_response(EMPTY_CHAT_HISTORY_BODY, 400)
         
-        # Import from separate extractor module (avoids LiveKit plugin issues)
-        from llm_extractor import extract_user_info_from_chat
+        logger.info("📝 Processing conversation save - %d messages", len(chat_history))
         
-        # Extract user info using LLM (synchronous)
-        user_info = extract_user_info_from_chat(chat_history)
-        
-        name = user_info.get('name', 'Unknown')
-        company = user_info.get('company', 'Unknown')
-        
-        logger.info(f"📊 Extracted info - Name: {name}, Company: {company}")
-        
-        # Save to Supabase synchronously
-        supabase_client = get_supabase_client()
-        
-        # Call the async function synchronously using asyncio
-        import asyncio
-        try:
-            # Try to get existing event loop
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_closed():
-                    raise RuntimeError("Loop is closed")
-            except RuntimeError:
-                # Create new event loop if none exists
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            # Run the async function
-            if loop.is_running():
-                # If loop is already running, create a task
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as pool:
-                    result = pool.submit(
-                        asyncio.run,
-                        supabase_client.save_chat_history(
-                            name=name,
-                            company_name=company,
-                            chat_history=chat_history
-                        )
-                    ).result()
-            else:
-                # If loop is not running, run it
-                result = loop.run_until_complete(
-                    supabase_client.save_chat_history(
-                        name=name,
-                        company_name=company,
-                        chat_history=chat_history
-                    )
-                )
-        except Exception as loop_error:
-            logger.error(f"Event loop error: {loop_error}")
-            # Fallback: create fresh loop
-            new_loop = asyncio.new_event_loop()
-            result = new_loop.run_until_complete(
-                supabase_client.save_chat_history(
-                    name=name,
-                    company_name=company,
-                    chat_history=chat_history
-                )
-            )
-            new_loop.close()
-        
-        logger.info(f"💾 Saved conversation - Name: {name}, Company: {company}, Messages: {len(chat_history)}")
+        supabase_client = await get_supabase_client()
+        result = await supabase_client.save_chat_history(
+            name=None,
+            company_name=None,
+            chat_history=chat_history,
+            extraction_status="pending"
+        )
         
-        return jsonify({
+        if "error" in result:
+            logger.error("Failed to save conversation: %s", result['error'])
+            return json_response({"error": result["error"]}, 500)
+        
+        if result.get("duplicate"):
+            # Identical conversation saved before; report that record as it stands
+            logger.info("💾 Conversation already saved - Record: %s", result.get('id'))
+            return json_response({
+                "success": True,
+                "duplicate": True,
+                "name": result.get("name"),
+                "company": result.get("company"),
+                "status": result.get("extraction_status"),
+                "message_count": len(chat_history),
+                "record_id": result.get('id')
+            })
+        
+        logger.info("💾 Saved conversation pending extraction - Messages: %d", len(chat_history))
+        
+        return json_response({
             "success": True,
-            "name": name,
-            "company": company,
+            "duplicate": False,
+            "name": None,
+            "company": None,
+            "status": "pending",
             "message_count": len(chat_history),
-            "record_id": result.get('id') if result else None
-        })
+            "record_id": result.get('id')
+        }, 202)
         
     except Exception as e:
-        logger.error(f"Error saving conversation: {str(e)}")
+        logger.error("Error saving conversation: %s", e)
         import traceback
         traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}, 500)
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=True)
\ No newline at end of file
+    # Local development entry point; production runs under gunicorn (gunicorn.conf.py).
+    # No reloader: it polls every imported file for changes.
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 5001)), reload=False,
+                log_level="debug" if DEV_MODE else "info")
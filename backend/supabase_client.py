@@ -1,11 +1,14 @@
 # supabase_client.py - Supabase Database Client Configuration
 import os
 import json
+import asyncio
+import hashlib
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
 
 # Load environment variables
 load_dotenv()
@@ -14,46 +17,74 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# Connection pool shared by every request in the process (keep-alive + HTTP/2)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+# Records fetched per query when streaming chat history
+CHAT_PAGE_SIZE = 100
+
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger("SupabaseClient")
 
 class SupabaseClient:
     """Supabase client for handling chat storage and client data."""
     
-    def __init__(self):
-        """Initialize Supabase client."""
-        if not SUPABASE_URL or not SUPABASE_KEY:
-            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
+    def __init__(self, client: AsyncClient, http_client: Optional[httpx.AsyncClient] = None):
+        """
+        Wrap an async Supabase client.
         
-        # Use service role key for bypassing RLS if needed
-        self.client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        logger.info("Supabase client initialized successfully")
+        Args:
+            client: Async Supabase SDK client
+            http_client: httpx client backing the SDK, closed by aclose()
+        """
+        self.client: AsyncClient = client
+        self._http_client = http_client
     
-    async def save_chat_history(self, name: str, company_name: str, chat_history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+    
+    async def save_chat_history(self, name: Optional[str], company_name: Optional[str], chat_history: List[Dict[str, Any]],
+                                extraction_status: Optional[str] = None) -> Dict[str, Any]:
         """
         Save chat history to Supabase chat_history table.
         
+        Each save is keyed by a hash of name, company and the full message
+        list, so retrying the exact same save stores one row. Requires a
+        unique chat_hash column:
+            alter table chat_history add column chat_hash text unique;
+        
         Args:
-            name: Client name
-            company_name: Company name
+            name: Client name (None if not yet extracted)
+            company_name: Company name (None if not yet extracted)
             chat_history: List of chat messages with timestamp, speaker, and message
+            extraction_status: Optional status for deferred name/company extraction (e.g. 'pending')
             
         Returns:
-            Dict containing the saved chat record
+            Dict containing the saved chat record; when an identical save
+            already existed, that record with "duplicate": True
         """
         try:
+            chat_hash = chat_history_hash(name, company_name, chat_history)
+            
             # Prepare the chat data
             chat_data = {
                 "name": name,
                 "company": company_name,  # Fixed: using 'company' instead of 'company_name'
-                "chat_history": json.dumps(chat_history)  # Store as JSON string
+                "chat_history": json.dumps(chat_history),  # Store as JSON string
+                "chat_hash": chat_hash
             }
+            if extraction_status is not None:
+                chat_data["extraction_status"] = extraction_status
             
-            # Insert into chat_history table
+            # Insert into chat_history table; a retried save of the same
+            # conversation hits the unique chat_hash and is skipped
             try:
-                # First try normal insert
-                result = self.client.table("chat_history").insert(chat_data).execute()
+                result = await self.client.table("chat_history") \
+                    .upsert(chat_data, on_conflict="chat_hash", ignore_duplicates=True) \
+                    .execute()
             except Exception as insert_error:
                 error_msg = str(insert_error).lower()
                 if 'row-level security' in error_msg or '42501' in error_msg:
@@ -62,18 +93,23 @@ class SupabaseClient:
                     logger.error("Either disable RLS or create a policy that allows INSERT operations")
                     return {"error": "Database security policy blocks insert. Please check Supabase RLS settings."}
                 else:
-                    logger.error(f"Database insert failed: {insert_error}")
+                    logger.error("Database insert failed: %s", insert_error)
                     return {"error": str(insert_error)}
             
             if result.data:
-                logger.info(f"Successfully saved chat for {name} from {company_name} with {len(chat_history)} messages")
+                logger.info("Successfully saved chat for %s from %s with %d messages", name, company_name, len(chat_history))
                 return result.data[0]
+            
+            existing = await self.client.table("chat_history").select("*").eq("chat_hash", chat_hash).limit(1).execute()
+            if existing.data:
+                logger.info("Chat for %s from %s already saved, skipping duplicate", name, company_name)
+                return {**existing.data[0], "duplicate": True}
             else:
-                logger.error(f"Failed to save chat history: {result}")
+                logger.error("Failed to save chat history: %s", result)
                 return {"error": "Failed to save chat history"}
                 
         except Exception as e:
-            logger.error(f"Error saving chat history: {str(e)}")
+            logger.error("Error saving chat history: %s", e)
             return {"error": str(e)}
     
     async def search_client_by_company(self, company_name: str) -> Optional[Dict[str, Any]]:
@@ -88,17 +124,17 @@ class SupabaseClient:
         """
         try:
             # Search in clients table (you may need to adjust table name)
-            result = self.client.table("clients").select("*").ilike("company", f"%{company_name}%").execute()
+            result = await self.client.table("clients").select("*").ilike("company", f"%{company_name}%").execute()
             
             if result.data and len(result.data) > 0:
-                logger.info(f"Found client data for company: {company_name}")
+                logger.info("Found client data for company: %s", company_name)
                 return result.data[0]
             else:
-                logger.info(f"No client data found for company: {company_name}")
+                logger.info("No client data found for company: %s", company_name)
                 return None
                 
         except Exception as e:
-            logger.error(f"Error searching for client: {str(e)}")
+            logger.error("Error searching for client: %s", e)
             return None
     
     async def search_client_by_name(self, name: str) -> Optional[Dict[str, Any]]:
@@ -113,17 +149,17 @@ class SupabaseClient:
         """
         try:
             # Search in clients table
-            result = self.client.table("clients").select("*").ilike("name", f"%{name}%").execute()
+            result = await self.client.table("clients").select("*").ilike("name", f"%{name}%").execute()
             
             if result.data and len(result.data) > 0:
-                logger.info(f"Found client data for name: {name}")
+                logger.info("Found client data for name: %s", name)
                 return result.data[0]
             else:
-                logger.info(f"No client data found for name: {name}")
+                logger.info("No client data found for name: %s", name)
                 return None
                 
         except Exception as e:
-            logger.error(f"Error searching for client: {str(e)}")
+            logger.error("Error searching for client: %s", e)
             return None
     
     async def get_chat_history(self, name: Optional[str] = None, company_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
@@ -139,27 +175,98 @@ class SupabaseClient:
             List of chat history records
         """
         try:
-            query = self.client.table("chat_history").select("*").order("created_at", desc=True).limit(limit)
+            records = [record async for page in self.iter_chat_history_pages(name, company_name, limit) for record in page]
+        except Exception as e:
+            logger.error("Error retrieving chat history: %s", e)
+            return []
+        if records:
+            logger.info("Retrieved %d chat history records", len(records))
+        else:
+            logger.info("No chat history found")
+        return records
+    
+    async def iter_chat_history_pages(self, name: Optional[str] = None, company_name: Optional[str] = None, limit: int = 50,
+                                      page_size: int = CHAT_PAGE_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream chat history from Supabase, newest first, one page per query.
+        
+        Pages are fetched sequentially, so a limit of N costs
+        ceil(N / page_size) round trips (e.g. 5 for limit=500 at the default
+        page size) instead of one. Query errors propagate to the caller so a
+        partial result is never mistaken for a complete one.
+        
+        Args:
+            name: Optional name filter
+            company_name: Optional company name filter
+            limit: Maximum number of records to yield in total
+            page_size: Number of records fetched per query
+            
+        Yields:
+            Lists of chat history records
+        """
+        fetched = 0
+        while fetched < limit:
+            size = min(page_size, limit - fetched)
+            query = self.client.table("chat_history").select("*").order("created_at", desc=True).range(fetched, fetched + size - 1)
             
             if name:
                 query = query.ilike("name", f"%{name}%")
             if company_name:
                 query = query.ilike("company_name", f"%{company_name}%")
             
-            result = query.execute()
+            result = await query.execute()
+            records = result.data or []
+            if records:
+                yield records
             
-            if result.data:
-                logger.info(f"Retrieved {len(result.data)} chat history records")
-                return result.data
-            else:
-                logger.info("No chat history found")
-                return []
-                
+            fetched += len(records)
+            if len(records) < size:
+                break
+    
+    async def get_chats_by_extraction_status(self, status: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Retrieve chat records waiting on deferred name/company extraction.
+        
+        Args:
+            status: Extraction status to filter on ('pending', 'submitted', ...)
+            limit: Maximum number of records to return
+            
+        Returns:
+            List of records with id, chat_history and extraction_batch_id
+        """
+        try:
+            result = await self.client.table("chat_history") \
+                .select("id, chat_history, extraction_batch_id") \
+                .eq("extraction_status", status) \
+                .order("created_at") \
+                .limit(limit) \
+                .execute()
+            return result.data or []
         except Exception as e:
-            logger.error(f"Error retrieving chat history: {str(e)}")
+            logger.error("Error retrieving chats with extraction status %s: %s", status, e)
             return []
     
-    def test_connection(self) -> bool:
+    async def update_chat_records(self, record_ids: List[Any], fields: Dict[str, Any]) -> bool:
+        """
+        Update fields on one or more chat_history records.
+        
+        Args:
+            record_ids: IDs of the records to update
+            fields: Column values to set
+            
+        Returns:
+            True if the update succeeded, False otherwise
+        """
+        if not record_ids:
+            return True
+        try:
+            await self.client.table("chat_history").update(fields).in_("id", record_ids).execute()
+            return True
+        except Exception as e:
+            logger.error("Error updating chat records %s: %s", record_ids, e)
+            return False
+    
+    async def test_connection(self) -> bool:
         """
         Test the Supabase connection.
         
@@ -168,23 +275,74 @@ class SupabaseClient:
         """
         try:
             # Try to query the chat_history table to test connection
-            result = self.client.table("chat_history").select("count", count="exact").limit(1).execute()
+            result = await self.client.table("chat_history").select("count", count="exact").limit(1).execute()
             logger.info("Supabase connection test successful")
             return True
         except Exception as e:
-            logger.error(f"Supabase connection test failed: {str(e)}")
+            logger.error("Supabase connection test failed: %s", e)
             return False
 
-# Global instance
+async def build_supabase_client(http_client: Optional[httpx.AsyncClient] = None) -> SupabaseClient:
+    """
+    Create a Supabase client on top of a pooled httpx client.
+    
+    Args:
+        http_client: Optional externally managed httpx.AsyncClient; a pooled
+            HTTP/2 client is created when omitted
+            
+    Returns:
+        Initialized SupabaseClient
+    """
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
+    
+    if http_client is None:
+        http_client = httpx.AsyncClient(limits=HTTP_LIMITS, http2=True)
+    
+    # Use service role key for bypassing RLS if needed
+    client = await acreate_client(SUPABASE_URL, SUPABASE_KEY, options=AsyncClientOptions(httpx_client=http_client))
+    logger.info("Supabase client initialized successfully")
+    return SupabaseClient(client, http_client)
+
+# Global instance, shared process-wide so connections are reused across requests
 supabase_client = None
+_supabase_lock = asyncio.Lock()
 
-def get_supabase_client() -> SupabaseClient:
+async def get_supabase_client() -> SupabaseClient:
     """Get or create Supabase client instance."""
     global supabase_client
     if supabase_client is None:
-        supabase_client = SupabaseClient()
+        async with _supabase_lock:
+            if supabase_client is None:
+                supabase_client = await build_supabase_client()
     return supabase_client
 
+async def close_supabase_client() -> None:
+    """Close the global Supabase client, if one was created."""
+    global supabase_client
+    if supabase_client is not None:
+        await supabase_client.aclose()
+        supabase_client = None
+
+def chat_history_hash(name: Optional[str], company_name: Optional[str], chat_history: List[Dict[str, Any]]) -> str:
+    """
+    Hash a conversation for duplicate detection.
+    
+    Covers the client name, company and every message in order, so two
+    clients with the same transcript, or two identical turns within one
+    transcript, are never conflated.
+    
+    Args:
+        name: Client name
+        company_name: Company name
+        chat_history: List of chat messages
+        
+    Returns:
+        Hex digest identifying this exact save
+    """
+    payload = json.dumps([name, company_name, chat_history], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
 def format_chat_message(timestamp: str, speaker: str, message: str, message_type: str = "text") -> Dict[str, Any]:
     """
     Format a chat message for storage.
@@ -207,6 +365,12 @@ def format_chat_message(timestamp: str, speaker: str, message: str, message_type
 
 if __name__ == "__main__":
     # Test the client
-    client = get_supabase_client()
-    success = client.test_connection()
+    async def _main() -> bool:
+        client = await get_supabase_client()
+        try:
+            return await client.test_connection()
+        finally:
+            await close_supabase_client()
+    
+    success = asyncio.run(_main())
     print(f"Supabase connection: {'✅ Success' if success else '❌ Failed'}")
\ No newline at end of file